@@ -1,42 +1,61 @@
 #!/usr/bin/env python3
-import argparse, os, sys, time, json, socket
+import argparse, os, sys, time, socket, subprocess, selectors, struct
 import multiprocessing as mp
 from datetime import datetime
 from pathlib import Path
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+from logging.handlers import RotatingFileHandler, MemoryHandler, QueueHandler, QueueListener
 import stat as pystat
 import requests
+from requests.adapters import HTTPAdapter
 
-FIFO_PATH = "/tmp/djs_queue"     
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
+
+FIFO_PATH = "/tmp/djs_queue"
 LOG_DIRNAME = "logs"
 LOG_FILE = "app.log"
 ENTRIES_DIRNAME = "entries"
 
+WEATHER_URL = "https://api.open-meteo.com/v1/forecast"
+
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+
 def setup_logging(repo_dir: Path):
     log_dir = repo_dir / LOG_DIRNAME
     log_dir.mkdir(parents=True, exist_ok=True)
     log_path = log_dir / LOG_FILE
     root = logging.getLogger()
     root.setLevel(logging.INFO)
+    root.handlers.clear()
     fmt = logging.Formatter("%(asctime)s - %(levelname)s - %(name)s => %(message)s")
-    sh = logging.StreamHandler()
-    sh.setLevel(logging.INFO)
-    sh.setFormatter(fmt)
-    fh = RotatingFileHandler(log_path, maxBytes=1_000_000, backupCount=5, encoding="utf-8")
+    fh = RotatingFileHandler(log_path, maxBytes=1_000_000, backupCount=5, delay=True, encoding="utf-8")
     fh.setLevel(logging.INFO)
     fh.setFormatter(fmt)
-    root.addHandler(sh)
-    root.addHandler(fh)
+    mh = MemoryHandler(capacity=64, flushLevel=logging.WARNING, target=fh)
+    handlers = [mh]
+    if os.isatty(2):
+        sh = logging.StreamHandler()
+        sh.setLevel(logging.INFO)
+        sh.setFormatter(fmt)
+        handlers.append(sh)
+    log_q = queue.Queue(-1)
+    root.addHandler(QueueHandler(log_q))
+    listener = QueueListener(log_q, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
 
 
 def fetch_weather(lat: float, lon: float):
-    url = "https://api.open-meteo.com/v1/forecast"
     params = {"latitude": lat, "longitude": lon, "current_weather": "true"}
     try:
-        r = requests.get(url, params=params, timeout=10)
+        r = SESSION.get(WEATHER_URL, params=params, timeout=10)
         r.raise_for_status()
-        cw = r.json().get("current_weather") or {}
+        cw = _json.loads(r.content).get("current_weather") or {}
         return {
             "temperature": cw.get("temperature"),
             "windspeed": cw.get("windspeed"),
@@ -58,67 +77,99 @@ def ensure_fifo(path: str):
 
 def md_path_for_today(repo_dir: Path) -> Path:
     today = datetime.now().strftime("%Y-%m-%d")
-    entries = repo_dir / ENTRIES_DIRNAME
-    entries.mkdir(parents=True, exist_ok=True)
-    return entries / f"{today}.md"
+    return repo_dir / ENTRIES_DIRNAME / f"{today}.md"
+
+_weather_cache: dict[str, dict] = {}
 
 def write_header_if_new(md_path: Path, with_weather: bool, lat: float, lon: float):
-    if md_path.exists() and md_path.stat().st_size > 0: 
-        return
-    lines = [f"# {md_path.stem}\n"]
-    if with_weather:
-        w = fetch_weather(lat, lon)
-        if w and w.get("temperature") is not None:
-            lines.append(f"*Weather:* {w['temperature']}°C, wind {w.get('windspeed','?')} km/h, at {w.get('time','now')}\n")
-    lines.append("\n---\n\n")
-    md_path.write_text("".join(lines), encoding="utf-8")
-
-def append_entry(md_path: Path, message: str):
-    ts = datetime.now().strftime("%H:%M")
-    with open(md_path, "a", encoding="utf-8") as f:
-        f.write(f"- {ts} {message}\n")
-
-def fork_and_push(repo_dir: Path, md_path: Path):
-    import os
+    try:
+        fd = os.open(md_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    except FileExistsError:
+        if md_path.stat().st_size > 0:
+            return
+        fd = os.open(md_path, os.O_WRONLY | os.O_TRUNC)
+    try:
+        chunks = [f"# {md_path.stem}\n".encode("utf-8")]
+        if with_weather:
+            day = md_path.stem
+            if day not in _weather_cache:
+                _weather_cache[day] = fetch_weather(lat, lon)
+            w = _weather_cache[day]
+            if w and w.get("temperature") is not None:
+                chunks.append(f"*Weather:* {w['temperature']}°C, wind {w.get('windspeed','?')} km/h, at {w.get('time','now')}\n".encode("utf-8"))
+        chunks.append(b"\n---\n\n")
+        os.writev(fd, chunks)
+    finally:
+        os.close(fd)
+
+def push_worker(repo_dir: Path, push_q: mp.Queue):
+    setup_logging(repo_dir)  # the parent's listener thread does not survive the fork
+    log = logging.getLogger("push")
     script = repo_dir / "push.sh"
-    if not script.exists():
-        logging.error(f"push.sh not found at {script}")
-        return
-    pid = os.fork()
-    if pid == 0:
+    while True:
         try:
-            os.execv("/bin/bash", ["/bin/bash", str(script), str(repo_dir), str(md_path)])
+            md_path = push_q.get()
+            if not script.exists():
+                log.error(f"push.sh not found at {script}")
+                continue
+            res = subprocess.run(["/bin/bash", str(script), str(repo_dir), str(md_path)])
+            if res.returncode != 0:
+                log.warning(f"push.sh exited with code {res.returncode}")
+        except KeyboardInterrupt:
+            break
         except Exception as e:
-            print(f"[child] exec failed: {e}", file=sys.stderr, flush=True)
-            os._exit(127)
+            log.exception(f"push error: {e}")
 
-def writer_loop(repo_dir: Path, with_weather: bool, lat: float, lon: float, q: mp.Queue):
+def writer_loop(repo_dir: Path, with_weather: bool, lat: float, lon: float, msg_r: int, push_q: mp.Queue):
+    setup_logging(repo_dir)  # the parent's listener thread does not survive the fork
     log = logging.getLogger("writer")
+    (repo_dir / ENTRIES_DIRNAME).mkdir(parents=True, exist_ok=True)
+    current_date = datetime.now().date()
     md_path = md_path_for_today(repo_dir)
     write_header_if_new(md_path, with_weather, lat, lon)
+    out_fd = os.open(md_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    size = os.fstat(out_fd).st_size
     log.info(f"writer started. writing to {md_path}")
     SIZE_LIMIT = 10_240  # 10KB
+    last_minute = -1
+    last_ts = ""
+    buf = b""
     while True:
         try:
-            msg = q.get()
-            if not isinstance(msg, str): 
-                continue
-            m = msg.strip()
-            if not m: 
-                continue
-            today_path = md_path_for_today(repo_dir)
-            if today_path != md_path:
-                md_path = today_path
-                write_header_if_new(md_path, with_weather, lat, lon)
-                log.info(f"new day -> switching to {md_path}")
-
-            if not md_path.exists():
-                write_header_if_new(md_path, with_weather, lat, lon)
-            append_entry(md_path, m)
-            log.info(f"appended entry: {m!r}")
-            if md_path.stat().st_size >= SIZE_LIMIT:
-                log.info(f"{md_path.name} reached >=10KB; pushing to GitHub...")
-                fork_and_push(repo_dir, md_path)
+            data = os.read(msg_r, 65536)
+            if not data:
+                break
+            buf += data
+            while len(buf) >= 4:
+                (n,) = struct.unpack_from("!I", buf)
+                if len(buf) < 4 + n:
+                    break
+                m = buf[4:4 + n]
+                buf = buf[4 + n:]
+                if not m:
+                    continue
+                d = datetime.now().date()
+                if d != current_date:
+                    current_date = d
+                    os.close(out_fd)
+                    md_path = md_path_for_today(repo_dir)
+                    write_header_if_new(md_path, with_weather, lat, lon)
+                    out_fd = os.open(md_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                    size = os.fstat(out_fd).st_size
+                    log.info(f"new day -> switching to {md_path}")
+
+                minute = int(time.time()) // 60
+                if minute != last_minute:
+                    last_ts = time.strftime("%H:%M")
+                    last_minute = minute
+                text = m.decode("utf-8", "replace")
+                encoded = f"- {last_ts} {text}\n".encode("utf-8")
+                os.write(out_fd, encoded)
+                size += len(encoded)
+                log.info(f"appended entry: {text!r}")
+                if size >= SIZE_LIMIT:
+                    log.info(f"{md_path.name} reached >=10KB; pushing to GitHub...")
+                    push_q.put(str(md_path))
         except KeyboardInterrupt:
             break
         except Exception as e:
@@ -133,23 +184,46 @@ def start_daemon(args):
     setup_logging(repo_dir)
     log = logging.getLogger("main")
     log.info("starting Daily-journal-sync...")
-    q = mp.Queue()
-    p = mp.Process(target=writer_loop, args=(repo_dir, args.with_weather, args.lat, args.lon, q), daemon=True)
+    msg_r, msg_w = os.pipe()
+    push_q = mp.Queue()
+    pw = mp.Process(target=push_worker, args=(repo_dir, push_q), daemon=True)
+    pw.start()
+    log.info(f"push worker pid={pw.pid}")
+    p = mp.Process(target=writer_loop, args=(repo_dir, args.with_weather, args.lat, args.lon, msg_r, push_q), daemon=True)
     p.start()
+    os.close(msg_r)
     log.info(f"writer pid={p.pid}")
     ensure_fifo(FIFO_PATH)
+    fd = os.open(FIFO_PATH, os.O_RDONLY | os.O_NONBLOCK)
+    # hold a write end ourselves so the fd never sees EOF when producers close
+    keep_alive = os.open(FIFO_PATH, os.O_WRONLY | os.O_NONBLOCK)
+    sel = selectors.DefaultSelector()
+    sel.register(fd, selectors.EVENT_READ)
     log.info(f"listening on FIFO {FIFO_PATH}")
+    buf = b""
     while True:
         try:
-            with open(FIFO_PATH, "r", buffering=1, encoding="utf-8") as fifo:
-                for line in fifo: 
-                    q.put(line.strip())
+            sel.select()
+            data = os.read(fd, 65536)
+            if not data:
+                continue
+            buf += data
+            lines = buf.split(b"\n")
+            buf = lines.pop()
+            batch = [s for s in (raw.strip(b" \t\r") for raw in lines) if s]
+            if batch:
+                payload = b"".join(struct.pack("!I", len(s)) + s for s in batch)
+                os.write(msg_w, payload)
         except KeyboardInterrupt:
             log.info("shutting down by KeyboardInterrupt")
             break
         except Exception as e:
             log.exception(f"fifo read error: {e}")
             time.sleep(1)
+    sel.close()
+    os.close(fd)
+    os.close(keep_alive)
+    os.close(msg_w)
     p.join(timeout=2)
 
 def add_note(args):